@@ -1,21 +1,39 @@
 import streamlit as st
-import google.generativeai as genai
-import requests
-import traceback
+import re
+from itertools import islice
+from functools import partial
+import logging
 from src.fin_dashboard.ui import (
     init_streamlit,
     display_company_info,
     display_financial_metrics,
     display_sec_filings,
     display_ai_insights,
+    display_analysis_report,
     display_ratios,
     display_trend_summary,
-    display_portfolio_summary
+    WELCOME_REPORTS_CARD,
+    WELCOME_AI_CARD
+)
+from src.fin_dashboard import ui
+from src.fin_dashboard.datasources import (
+    fetch_company_bundle,
+    clear_file_cache,
+    get_http_session,
+    get_sec_cik_mapping,
+    parse_json,
+    prefetch_company_bundle,
+    run_concurrently,
+    run_until_accepted
 )
-from src.fin_dashboard.datasources import get_finnhub_company_data, get_sec_filings
-from src.fin_dashboard.llm import get_enhanced_ai_analysis, get_predictive_insights
 from src.fin_dashboard.analytics import compute_ratios, summarize_trends
-from src.fin_dashboard.config import FINNHUB_API_KEY
+from src.fin_dashboard.config import FINNHUB_API_KEY, DEBUG_MODE
+
+# Optional ui helper, resolved once at import instead of on every render
+HAS_PORTFOLIO_SUMMARY = hasattr(ui, "display_portfolio_summary")
+
+# Markdown heading markers and bold/italic asterisks, stripped from LLM output
+MARKDOWN_SYMBOLS_RE = re.compile(r'#{1,6}\s*|\*+')
 
 # ---------------------------
 # DEBUG FUNCTIONS
@@ -28,50 +46,70 @@ def debug_finnhub_api():
         st.error("❌ No Finnhub API key found in secrets!")
         return
     
-    st.write(f"**API Key Length:** {len(FINNHUB_API_KEY)} characters")
-    st.write(f"**API Key Preview:** {FINNHUB_API_KEY[:8]}...")
+    # Collect everything first, then render it as one status block + one JSON block
+    status_lines = [
+        f"API Key Length: {len(FINNHUB_API_KEY)} characters",
+        f"API Key Preview: {FINNHUB_API_KEY[:8]}..."
+    ]
+    previews = {}
+    errors = []
     
     test_url = "https://finnhub.io/api/v1/stock/profile2"
     test_params = {"symbol": "AAPL", "token": FINNHUB_API_KEY}
+    metrics_url = "https://finnhub.io/api/v1/stock/metric"
+    metrics_params = {"symbol": "AAPL", "metric": "all", "token": FINNHUB_API_KEY}
+    
+    def probe(url, params):
+        try:
+            return get_http_session().get(url, params=params, timeout=10), None
+        except Exception as e:
+            return None, e
+    
+    # Both endpoints are independent - probe them at once
+    (response, profile_error), (metrics_response, metrics_error) = run_concurrently(
+        partial(probe, test_url, test_params),
+        partial(probe, metrics_url, metrics_params)
+    )
     
     try:
-        st.write("**Testing Profile Endpoint...**")
-        response = requests.get(test_url, params=test_params, timeout=10)
-        st.write(f"**Status Code:** {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            st.write("**✅ Profile Data (First few fields):**")
-            st.json({k: v for k, v in list(data.items())[:5]} if data else "Empty response")
+        if profile_error:
+            errors.append(f"**❌ API Debug Error:** {profile_error}")
         else:
-            st.error(f"**❌ Profile Error:** {response.text}")
-            
-        st.write("**Testing Metrics Endpoint...**")
-        metrics_url = "https://finnhub.io/api/v1/stock/metric"
-        metrics_params = {"symbol": "AAPL", "metric": "all", "token": FINNHUB_API_KEY}
-        
-        metrics_response = requests.get(metrics_url, params=metrics_params, timeout=10)
-        st.write(f"**Metrics Status:** {metrics_response.status_code}")
-        
-        if metrics_response.status_code == 200:
-            metrics_data = metrics_response.json()
-            st.write("**✅ Metrics Data Structure:**")
-            if metrics_data and 'metric' in metrics_data:
-                key_metrics = {
-                    'peNormalizedAnnual': metrics_data['metric'].get('peNormalizedAnnual'),
-                    'grossMarginAnnual': metrics_data['metric'].get('grossMarginAnnual'),
-                    'netProfitMarginAnnual': metrics_data['metric'].get('netProfitMarginAnnual'),
-                    'revenueGrowthTTMYoy': metrics_data['metric'].get('revenueGrowthTTMYoy'),
-                    'marketCapitalization': metrics_data['metric'].get('marketCapitalization')
-                }
-                st.json(key_metrics)
+            status_lines.append(f"Profile Status: {response.status_code}")
+            if response.status_code == 200:
+                data = parse_json(response)
+                previews["profile_preview"] = dict(islice(data.items(), 5)) if data else "Empty response"
             else:
-                st.json(metrics_data)
+                errors.append(f"**❌ Profile Error:** {response.text}")
+        
+        if metrics_error:
+            errors.append(f"**❌ API Debug Error:** {metrics_error}")
         else:
-            st.error(f"**❌ Metrics Error:** {metrics_response.text}")
+            status_lines.append(f"Metrics Status: {metrics_response.status_code}")
+            if metrics_response.status_code == 200:
+                metrics_data = parse_json(metrics_response)
+                if metrics_data and 'metric' in metrics_data:
+                    previews["metrics_preview"] = {
+                        'peNormalizedAnnual': metrics_data['metric'].get('peNormalizedAnnual'),
+                        'grossMarginAnnual': metrics_data['metric'].get('grossMarginAnnual'),
+                        'netProfitMarginAnnual': metrics_data['metric'].get('netProfitMarginAnnual'),
+                        'revenueGrowthTTMYoy': metrics_data['metric'].get('revenueGrowthTTMYoy'),
+                        'marketCapitalization': metrics_data['metric'].get('marketCapitalization')
+                    }
+                else:
+                    previews["metrics_preview"] = metrics_data
+            else:
+                errors.append(f"**❌ Metrics Error:** {metrics_response.text}")
             
     except Exception as e:
-        st.error(f"**❌ API Debug Error:** {e}")
+        errors.append(f"**❌ API Debug Error:** {e}")
+    
+    with st.container():
+        st.code("\n".join(status_lines))
+        if previews:
+            st.json(previews)
+        if errors:
+            st.error("\n\n".join(errors))
 
 def debug_sec_api():
     """Debug SEC API access"""
@@ -89,25 +127,77 @@ def debug_sec_api():
         "Connection": "keep-alive"
     }
     
-    for url in urls_to_test:
-        st.write(f"**Testing:** {url}")
+    def probe(url):
+        try:
+            # HEAD is enough to check reachability - the ~1 MB body comes from the shared cache below
+            return get_http_session().head(url, headers=headers, timeout=15, allow_redirects=True), None
+        except Exception as e:
+            return None, e
+    
+    # Race every host and stop at the first 200 - a hung mirror no longer holds up the result
+    results = run_until_accepted(
+        *[partial(probe, url) for url in urls_to_test],
+        accept=lambda result: result[0] is not None and result[0].status_code == 200
+    )
+    
+    # Collect per-host results in the order they answered, then render them in one block
+    status_lines = []
+    errors = []
+    success = None
+    preview = None
+    reachable_url = None
+    
+    for index, (response, error) in results:
+        url = urls_to_test[index]
+        status_lines.append(f"Testing: {url}")
         try:
-            response = requests.get(url, headers=headers, timeout=15)
-            st.write(f"**Status:** {response.status_code}")
-            st.write(f"**Headers:** {dict(list(response.headers.items())[:3])}")
+            if error:
+                raise error
+            status_lines.append(f"  Status: {response.status_code}")
+            status_lines.append(f"  Headers: {dict(islice(response.headers.items(), 3))}")
             
             if response.status_code == 200:
-                data = response.json()
-                st.success(f"✅ Success! Got {len(data)} companies")
-                if data:
-                    first_key = list(data.keys())[0]
-                    st.json({first_key: data[first_key]})
-                break
+                reachable_url = url
             else:
-                st.error(f"❌ Failed: {response.text[:200]}")
+                errors.append(f"❌ {url} failed: HTTP {response.status_code} {response.reason}")
                 
         except Exception as e:
-            st.error(f"❌ Exception: {str(e)}")
+            errors.append(f"❌ {url} exception: {str(e)}")
+    
+    # The probes only check reachability; the company count comes from the table the app itself uses
+    if reachable_url:
+        mapping = get_sec_cik_mapping()
+        if mapping["data"]:
+            success = f"✅ {reachable_url} is reachable. App's cached ticker table (www.sec.gov): {len(mapping['data'])} companies"
+            preview = dict(islice(mapping["data"].items(), 1))
+        else:
+            reason = mapping["errors"][0]["message"] if mapping["errors"] else "table is empty"
+            errors.append(f"❌ {reachable_url} is reachable, but the app's ticker table (www.sec.gov) failed to load: {reason}")
+    
+    with st.container():
+        st.code("\n".join(status_lines))
+        if errors:
+            st.error("\n\n".join(errors))
+        if success:
+            st.success(success)
+        if preview:
+            st.json(preview)
+
+# ---------------------------
+# DATA HELPERS
+# ---------------------------
+def load_company_data(symbol, include_sec=True):
+    """Fetch Finnhub + SEC data into session_state (shared by both workflows)"""
+    finnhub_result, sec_result = fetch_company_bundle(symbol, count=5, include_sec=include_sec)
+    
+    st.session_state.finnhub_data = finnhub_result.get("data", {})
+    st.session_state.sec_data = sec_result.get("data", [])
+    st.session_state.ticker_symbol = symbol
+    st.session_state.loaded_include_sec = include_sec
+    st.session_state.ratios = compute_ratios(st.session_state.finnhub_data)
+    st.session_state.trends = summarize_trends(st.session_state.finnhub_data)
+    
+    return finnhub_result, sec_result
 
 # ---------------------------
 # Initialize Streamlit UI
@@ -142,6 +232,7 @@ elif debug_option == "🔍 Debug SEC API":
 elif debug_option == "🔍 Clear Cache":
     st.cache_data.clear()
     st.cache_resource.clear()
+    clear_file_cache()
     st.sidebar.success("✅ Cache cleared!")
     if st.sidebar.button("🏠 Back to Main"):
         st.rerun()
@@ -150,6 +241,7 @@ elif debug_option == "🔍 Debug Gemini Models":
     api_key = st.secrets.get("GEMINI_API_KEY", "")
     
     if api_key:
+        import google.generativeai as genai  # Heavy import, only needed here
         genai.configure(api_key=api_key)
         st.write("**Available Models:**")
         
@@ -159,18 +251,40 @@ elif debug_option == "🔍 Debug Gemini Models":
                 st.code(f"Use: genai.GenerativeModel('{model.name}')")
     st.stop()
 
-# Regular controls
-example_tickers = ["AAPL", "GOOGL", "MSFT", "TSLA", "AMZN", "NVDA", "META", "NFLX"]
-ticker = st.sidebar.selectbox(
-    "Select or enter Stock Ticker:", example_tickers + ["Custom..."]
-)
-if ticker == "Custom...":
-    ticker = st.sidebar.text_input("Enter your ticker:", "AAPL")
+# Regular controls - a fragment, so changing the ticker or options only reruns this block
+@st.fragment
+def sidebar_controls():
+    """Ticker picker + analysis options, results shared via session_state"""
+    example_tickers = ["AAPL", "GOOGL", "MSFT", "TSLA", "AMZN", "NVDA", "META", "NFLX"]
+    # One widget for presets and custom symbols - typing a new ticker needs no extra input/rerun
+    ticker = st.selectbox(
+        "Select or enter Stock Ticker:", example_tickers, accept_new_options=True
+    )
+    ticker_changed = st.session_state.get('selected_ticker') != ticker
+    st.session_state.selected_ticker = ticker
+
+    # The AI panel is its own fragment and only reloads on a full run - trigger one for a new ticker
+    if ticker_changed and st.session_state.get('show_ai_analysis'):
+        st.rerun(scope="app")
+
+    # Warm the data caches as soon as a new ticker is picked, before any button is clicked
+    if ticker and st.session_state.get('prefetched_ticker') != ticker.upper():
+        st.session_state.prefetched_ticker = ticker.upper()
+        prefetch_company_bundle(ticker.upper(), count=5, include_sec=st.session_state.get('include_sec', True))
 
-# Analysis options
-st.sidebar.header("📊 Analysis Options")
-enable_rag = st.sidebar.checkbox("🧠 Enable RAG Analysis", value=True, help="Use historical data for enhanced insights")
-enable_predictions = st.sidebar.checkbox("🔮 Enable Predictions", value=True, help="Generate predictive insights")
+    # Analysis options
+    st.header("📊 Analysis Options")
+    st.checkbox("🧠 Enable RAG Analysis", value=True, key="enable_rag", help="Use historical data for enhanced insights")
+    st.checkbox("🔮 Enable Predictions", value=True, key="enable_predictions", help="Generate predictive insights")
+    st.checkbox("📄 Include SEC Filings", value=True, key="include_sec", help="Turn off to skip the SEC lookup when you only need the metrics")
+
+with st.sidebar:
+    sidebar_controls()
+
+ticker = st.session_state.selected_ticker
+enable_rag = st.session_state.enable_rag
+enable_predictions = st.session_state.enable_predictions
+include_sec = st.session_state.include_sec
 
 # Initialize session state for data persistence
 if 'finnhub_data' not in st.session_state:
@@ -181,6 +295,10 @@ if 'analysis_data' not in st.session_state:
     st.session_state.analysis_data = None
 if 'ticker_symbol' not in st.session_state:
     st.session_state.ticker_symbol = None
+if 'ratios' not in st.session_state:
+    st.session_state.ratios = None
+if 'trends' not in st.session_state:
+    st.session_state.trends = None
 
 # ---------------------------
 # Two-Button Architecture
@@ -198,17 +316,12 @@ with col2:
 # ---------------------------
 # View Reports Workflow
 # ---------------------------
-if view_reports:
+def render_reports(ticker, enable_predictions, include_sec):
+    """Fetch + render all report cards"""
     try:
         with st.spinner(f"🔍 Fetching comprehensive data for {ticker.upper()}..."):
-            # Fetch data with error handling
-            finnhub_result = get_finnhub_company_data(ticker.upper())
-            sec_result = get_sec_filings(ticker.upper(), count=5)
-            
-            # Store in session state
-            st.session_state.finnhub_data = finnhub_result.get("data", {})
-            st.session_state.sec_data = sec_result.get("data", [])
-            st.session_state.ticker_symbol = ticker.upper()
+            # Fetch data with error handling, stored in session state
+            finnhub_result, sec_result = load_company_data(ticker.upper(), include_sec)
             
             # Display any API errors
             for err in finnhub_result.get("errors", []):
@@ -218,33 +331,46 @@ if view_reports:
             for err in sec_result.get("errors", []):
                 st.warning(f"SEC Warning: {err.get('message', 'Unknown error')}")
         
+        # Read session state once; the proxy lookups add up across the display calls
+        finnhub_data = st.session_state.finnhub_data
+        sec_data = st.session_state.sec_data
+
         # Display data if available
-        if st.session_state.finnhub_data:
+        if finnhub_data:
             st.success("✅ Data fetched successfully!")
             
-            # UPGRADED: Enhanced display sections
-            display_company_info(st.session_state.finnhub_data)
-            display_financial_metrics(st.session_state.finnhub_data)
-            display_ratios(st.session_state.finnhub_data)
-            display_trend_summary(st.session_state.finnhub_data)
+            # Report sections split across tabs so the page opens on the overview
+            overview_tab, financials_tab, sec_tab, predictions_tab = st.tabs(
+                ["📋 Overview", "📊 Financials", "📄 SEC Filings", "🔮 Predictions"]
+            )
             
-            # Portfolio-style summary (if ui.py supports it)
-            try:
-                display_portfolio_summary(st.session_state.finnhub_data)
-            except:
-                pass  # Skip if function doesn't exist yet
+            with overview_tab:
+                display_company_info(finnhub_data)
+                display_financial_metrics(finnhub_data)
             
-            # SEC filings
-            if st.session_state.sec_data:
-                display_sec_filings(st.session_state.sec_data)
-            else:
-                st.info("ℹ️ No SEC filings data available")
+            with financials_tab:
+                display_ratios(finnhub_data)
+                display_trend_summary(finnhub_data)
+                
+                # Portfolio-style summary (if ui.py supports it)
+                if HAS_PORTFOLIO_SUMMARY:
+                    ui.display_portfolio_summary(finnhub_data)
             
-            # Predictive insights (if enabled)
-            if enable_predictions:
-                with st.spinner("🔮 Generating predictive insights..."):
+            with sec_tab:
+                if not include_sec:
+                    st.info("ℹ️ SEC filings are turned off in the sidebar")
+                elif sec_data:
+                    display_sec_filings(sec_data)
+                else:
+                    st.info("ℹ️ No SEC filings data available")
+            
+            with predictions_tab:
+                if not enable_predictions:
+                    st.info("🔮 Turn on \"Enable Predictions\" in the sidebar to see predictive insights.")
+                else:
+                    from src.fin_dashboard.llm import get_predictive_insights  # Lazy: warmed in background
                     try:
-                        insights = get_predictive_insights(st.session_state.finnhub_data, st.session_state.ticker_symbol)
+                        insights = get_predictive_insights(finnhub_data, st.session_state.ticker_symbol)
                         
                         if insights and not any('error' in insight for insight in insights):
                             st.markdown("""
@@ -275,36 +401,45 @@ if view_reports:
     except Exception as e:
         st.error(f"❌ Unexpected error: {str(e)}")
         st.error("Please try again or contact support if the issue persists.")
-        with st.expander("Debug Information"):
-            st.code(traceback.format_exc())
+        logging.exception("View Reports workflow failed")
+        if DEBUG_MODE:
+            import traceback  # Only needed on the debug path
+            with st.expander("Debug Information"):
+                st.code(traceback.format_exc())
+
+if view_reports:
+    render_reports(ticker, enable_predictions, include_sec)
 
 # ---------------------------
 # Enhanced AI Analysis Workflow with User Choice, sub buttons
 # ---------------------------
-if st.session_state.get('show_ai_analysis', False):
+@st.fragment
+def render_ai_analysis():
+    """AI analysis panel; its buttons rerun only this fragment, not the whole app"""
+    # Read the sidebar choices on every run - fragment reruns would otherwise replay stale arguments
+    ticker = st.session_state.selected_ticker
+    include_sec = st.session_state.include_sec
     # Back to Home button at the top
     if st.button("🏠 Back to Home"):
         if 'show_ai_analysis' in st.session_state:
             del st.session_state['show_ai_analysis']
         st.rerun()
     st.markdown("---")  # Visual separator
-    # Check if we need fresh data for new ticker
+    # Check if we need fresh data for a new ticker or a changed SEC option
     current_ticker = ticker.upper()
     if (not st.session_state.finnhub_data or 
-        st.session_state.ticker_symbol != current_ticker):
+        st.session_state.ticker_symbol != current_ticker or
+        st.session_state.get('loaded_include_sec') != include_sec):
         
         st.info(f"🔍 Fetching company data for {current_ticker}...")
         with st.spinner(f"Loading data for {current_ticker}..."):
-            finnhub_result = get_finnhub_company_data(current_ticker)
-            sec_result = get_sec_filings(current_ticker, count=5)
-            
-            st.session_state.finnhub_data = finnhub_result.get("data", {})
-            st.session_state.sec_data = sec_result.get("data", [])
-            st.session_state.ticker_symbol = current_ticker
+            load_company_data(current_ticker, include_sec)
+    
+    # Read session state once for the rest of the panel
+    finnhub_data = st.session_state.finnhub_data
     
-    # Check available data
-    multi_year_data = st.session_state.finnhub_data.get('multi_year_data', {})
-    has_historical_data = bool(multi_year_data.get('financial_data'))
+    # Check available data (flag computed at fetch time)
+    has_historical_data = finnhub_data.get('has_multi_year', False)
     
     # User query input (always show)
     user_query = st.text_area(
@@ -364,56 +499,49 @@ if st.session_state.get('show_ai_analysis', False):
         del st.session_state['analysis_type']
 
         try:
+            from src.fin_dashboard.llm import get_cached_ai_analysis, extract_analysis_fields  # Lazy: warmed in background
             query = user_query or "Provide a comprehensive financial analysis with historical context and predictive insights."
-            
-            # Prepare context data
+
+            # Prepare context data - only the fields the prompts use, not the raw payloads
+            company_info, sec_filings = extract_analysis_fields(finnhub_data, st.session_state.sec_data)
             context_data = {
-                "company_info": st.session_state.finnhub_data,
-                "sec_filings": st.session_state.sec_data,
-                "ratios": compute_ratios(st.session_state.finnhub_data),
-                "trends": summarize_trends(st.session_state.finnhub_data),
-                "ticker": st.session_state.ticker_symbol or ticker.upper(),
+                "company_info": company_info,
+                "sec_filings": sec_filings,
+                "ratios": st.session_state.ratios,
+                "trends": st.session_state.trends,
+                "ticker": st.session_state.ticker_symbol or current_ticker,
                 "force_standard": run_standard_analysis  # Force standard if standard button clicked
             }
             
             # Run analysis with appropriate spinner
             if run_rag_analysis:
-                with st.spinner("🧠 Generating RAG-enhanced analysis with historical context..."):
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    status_text.text("📊 Processing multi-year financial data...")
-                    progress_bar.progress(25)
-                    
-                    status_text.text("🔍 Creating document vectors...")
-                    progress_bar.progress(50)
-                    
-                    status_text.text("🧠 Retrieving relevant historical context...")
-                    progress_bar.progress(75)
-                    
-                    enhanced_response = get_enhanced_ai_analysis(context_data, query)
-                    
-                    status_text.text("✅ RAG-enhanced analysis complete!")
-                    progress_bar.progress(100)
-                    
-                    # Clear progress indicators
-                    progress_bar.empty()
-                    status_text.empty()
+                # Status label follows the real RAG stages, streamed text shows below it
+                stream_box = st.empty()
+                with st.status("🧠 Generating RAG-enhanced analysis with historical context...", expanded=False) as status:
+                    enhanced_response = get_cached_ai_analysis(
+                        context_data, query,
+                        on_chunk=stream_box.markdown,
+                        on_phase=lambda label: status.update(label=label)
+                    )
+                    status.update(label="✅ RAG-enhanced analysis complete!", state="complete")
+                stream_box.empty()
             else:
                 with st.spinner("🤖 Generating standard AI analysis..."):
-                    enhanced_response = get_enhanced_ai_analysis(context_data, query)
+                    # Stream partial text live, replaced by the formatted report below
+                    stream_box = st.empty()
+                    enhanced_response = get_cached_ai_analysis(context_data, query, on_chunk=stream_box.markdown)
+                    stream_box.empty()
             
             st.session_state.analysis_data = enhanced_response
             
             # Display results with professional styling
-            if st.session_state.analysis_data:
-                analysis_result = st.session_state.analysis_data
+            if enhanced_response:
+                analysis_result = enhanced_response
                 method_used = analysis_result.get("method", "Unknown")
                 context_sources = analysis_result.get("context_sources", 0)
                 analysis_text = analysis_result.get("analysis", "No analysis available")
             
                 # Clean text formatting - more robust approach
-                import re
                 formatted_text = str(analysis_text)
 
                 # Debug: Check what we're getting
@@ -421,12 +549,8 @@ if st.session_state.get('show_ai_analysis', False):
                     st.error("❌ Analysis text corrupted. Retrying...")
                     st.stop()
 
-                # Clean markdown symbols
-                formatted_text = re.sub(r'#{1,6}\s*', '', formatted_text)
-                formatted_text = re.sub(r'\*\*(.*?)\*\*', r'\1', formatted_text)
-                formatted_text = re.sub(r'\*(.*?)\*', r'\1', formatted_text)
-                formatted_text = formatted_text.replace('*', '')  # Remove any remaining asterisks
-                formatted_text = formatted_text.strip()
+                # Clean markdown symbols (headings + every asterisk) in one pass
+                formatted_text = MARKDOWN_SYMBOLS_RE.sub('', formatted_text).strip()
 
                 # Ensure we have actual content
                 if len(formatted_text) < 50:
@@ -434,143 +558,22 @@ if st.session_state.get('show_ai_analysis', False):
                     st.stop()
                 
                 # Professional Financial Report Display
-                if method_used == "RAG-Enhanced":
-                    st.success(f"✅ Enhanced Analysis Complete • {context_sources} Historical Data Points")
-                    
-                    # Executive Summary Header
-                    st.markdown(f"""
-                    <div style="
-                        background: linear-gradient(135deg, #1a365d 0%, #2d3748 100%);
-                        color: white;
-                        padding: 30px;
-                        border-radius: 15px 15px 0 0;
-                        margin: 20px 0 0 0;
-                    ">
-                        <div style="font-size: 28px; font-weight: 800; margin-bottom: 8px;">
-                            📊 FINANCIAL INTELLIGENCE REPORT
-                        </div>
-                        <div style="font-size: 16px; opacity: 0.9; font-weight: 500;">
-                            Enhanced Analysis • {context_sources} Multi-Year Data Points • RAG-Powered Insights
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Main Analysis Content
-                    st.markdown(f"""<div style="
-                        background: linear-gradient(135deg, #f7fafc 0%, #edf2f7 100%);
-                        border-left: 6px solid #38b2ac;
-                        padding: 0;
-                        margin: 0 0 20px 0;
-                        box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-                        color: #2d3748;
-                    ">
-                        <div style="
-                            background: rgba(56, 178, 172, 0.1);
-                            padding: 20px 30px;
-                            border-bottom: 2px solid rgba(56, 178, 172, 0.2);
-                        ">
-                            <div style="font-size: 20px; font-weight: 700; color: #2d3748; margin-bottom: 5px;">
-                                📈 EXECUTIVE ANALYSIS
-                            </div>
-                            <div style="font-size: 14px; color: #4a5568; font-weight: 500;">
-                                Historical Context Integration & Predictive Modeling
-                            </div>
-                        </div>
-                            {formatted_text}
-                        </div>
-                    </div>""", unsafe_allow_html=True)
-                    
-                    # Methodology Footer
-                    st.markdown(f"""
-                    <div style="
-                        background: linear-gradient(135deg, #38b2ac 0%, #319795 100%);
-                        color: white;
-                        padding: 25px 30px;
-                        border-radius: 0 0 15px 15px;
-                        margin: 0;
-                    ">
-                        <div style="font-size: 16px; font-weight: 600; margin-bottom: 8px;">
-                            🔬 METHODOLOGY & DATA SOURCES
-                        </div>
-                        <div style="font-size: 14px; opacity: 0.95; line-height: 1.6;">
-                            Advanced RAG system analyzed {context_sources} historical data points spanning multiple fiscal years. 
-                            Real-time market data integrated with historical patterns using AI-powered retrieval and synthesis.
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                else:
-                    st.success("✅ AI Financial Analysis Complete")
-                    
-                    # Standard Analysis Header
-                    st.markdown(f"""
-                    <div style="
-                        background: linear-gradient(135deg, #553c9a 0%, #667eea 100%);
-                        color: white;
-                        padding: 30px;
-                        border-radius: 15px 15px 0 0;
-                        margin: 20px 0 0 0;
-                    ">
-                        <div style="font-size: 28px; font-weight: 800; margin-bottom: 8px;">
-                            🤖 AI FINANCIAL REPORT
-                        </div>
-                        <div style="font-size: 16px; opacity: 0.9; font-weight: 500;">
-                            Professional Analysis • Current Market Data • AI-Generated Insights
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Main Analysis Content
-                    st.markdown(f"""<div style="
-                        background: linear-gradient(135deg, #f7fafc 0%, #edf2f7 100%);
-                        border-left: 6px solid #667eea;
-                        padding: 0;
-                        margin: 0 0 20px 0;
-                        box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-                        color: #2d3748;
-                    ">
-                        <div style="
-                            background: rgba(102, 126, 234, 0.1);
-                            padding: 20px 30px;
-                            border-bottom: 2px solid rgba(102, 126, 234, 0.2);
-                        ">
-                            <div style="font-size: 20px; font-weight: 700; color: #2d3748; margin-bottom: 5px;">
-                                📋 FINANCIAL ASSESSMENT
-                            </div>
-                            <div style="font-size: 14px; color: #4a5568; font-weight: 500;">
-                                Current Market Analysis & Performance Evaluation
-                            </div>
-                        </div>
-                            {formatted_text}
-                        </div>
-                    </div>""", unsafe_allow_html=True)
-                    
-                    # Standard Analysis Footer
-                    st.markdown(f"""
-                    <div style="
-                        background: linear-gradient(135deg, #667eea 0%, #553c9a 100%);
-                        color: white;
-                        padding: 25px 30px;
-                        border-radius: 0 0 15px 15px;
-                        margin: 0;
-                    ">
-                        <div style="font-size: 16px; font-weight: 600; margin-bottom: 8px;">
-                            📊 ANALYSIS SCOPE
-                        </div>
-                        <div style="font-size: 14px; opacity: 0.95; line-height: 1.6;">
-                            Analysis based on current financial metrics and real-time market data. 
-                            For enhanced historical context and predictive modeling, multi-year data is required.
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                display_analysis_report(method_used, context_sources, formatted_text)
             else:
                 st.error("❌ Could not generate enhanced analysis. Please try again.")
         
         except Exception as e:
             st.error(f"❌ Enhanced Analysis error: {str(e)}")
             st.info("💡 Tip: Try refreshing the page or check your API keys in Streamlit secrets.")
-            with st.expander("Debug Information"):
-                st.code(traceback.format_exc())
+            logging.exception("AI Analysis workflow failed")
+            if DEBUG_MODE:
+                import traceback  # Only needed on the debug path
+                with st.expander("Debug Information"):
+                    st.code(traceback.format_exc())
+
+if st.session_state.get('show_ai_analysis', False):
+    render_ai_analysis()
+
 # ---------------------------
 # Welcome Screen
 # ---------------------------
@@ -584,30 +587,10 @@ if not view_reports and not st.session_state.get('show_ai_analysis', False):
     col1, col2 = st.columns(2)
 
     with col1:
-        st.markdown("""
-        <div style="text-align: center; padding: 24px; background: linear-gradient(135deg, #e6f3ff 0%, #f0f8ff 100%); border-radius: 15px; border: 2px solid rgba(66, 153, 225, 0.2); margin-bottom: 20px;">
-            <h3 style="color: #2b6cb0; margin-bottom: 12px;">📊 View Reports</h3>
-            <p style="color: #4a5568; font-size: 14px; line-height: 1.6; margin: 0;">
-                • Interactive price & volume charts<br>
-                • Multi-year financial trends<br>
-                • Professional ratio analysis<br>
-                • Predictive insights
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(WELCOME_REPORTS_CARD, unsafe_allow_html=True)
 
     with col2:
-        st.markdown("""
-        <div style="text-align: center; padding: 24px; background: linear-gradient(135deg, #f0fff4 0%, #f7fafc 100%); border-radius: 15px; border: 2px solid rgba(56, 161, 105, 0.2); margin-bottom: 20px;">
-            <h3 style="color: #38a169; margin-bottom: 12px;">🧠 Enhanced AI Analysis</h3>
-            <p style="color: #4a5568; font-size: 14px; line-height: 1.6; margin: 0;">
-                • Gemini-powered insights<br>
-                • RAG-enhanced Historical data integration<br>
-                • Custom query responses<br>
-                • Predictive recommendations
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(WELCOME_AI_CARD, unsafe_allow_html=True)
 
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -1,6 +1,16 @@
+import json
 import streamlit as st
 
 
+def _payload_cache_key(finnhub_data):
+    """Cheap cache key for a Finnhub payload: symbol + fetch time, full content as fallback"""
+    if isinstance(finnhub_data, dict) and finnhub_data.get("as_of"):
+        return f"{finnhub_data.get('symbol')}@{finnhub_data['as_of']}"
+    return json.dumps(finnhub_data, sort_keys=True, default=str)
+
+# Skip deep-hashing the whole payload (price history etc.) on every cached call
+PAYLOAD_HASH_FUNCS = {dict: _payload_cache_key}
+
 def format_percent(value):
     """Format numbers as percentage with 2 decimals."""
     try:
@@ -58,6 +68,28 @@ def format_ratio(value, decimal_places=2):
     except (ValueError, TypeError):
         return "N/A"
 
+def _format_decimal_percent(value):
+    """Format a decimal fraction (0.25) as a percentage (25.00%)."""
+    return format_percent(value * 100)
+
+# (display label, Finnhub metric key, formatter), in display order
+_RATIO_MAP = (
+    # Core Valuation Ratios
+    ("P/E Ratio", "peNormalizedAnnual", format_ratio),
+    ("Price/Sales", "psAnnual", format_ratio),
+    # Debt and Leverage Ratios
+    ("Debt/Equity", "totalDebt/totalEquityAnnual", format_ratio),
+    # Profitability Ratios
+    ("ROE", "roeAnnual", _format_decimal_percent),
+    ("ROA", "roaAnnual", _format_decimal_percent),
+    ("EBITDA Margin", "ebitdaMarginAnnual", format_percent),
+    ("Gross Margin", "grossMarginAnnual", format_percent),
+    # Liquidity Ratios
+    ("Current Ratio", "currentRatioAnnual", format_ratio),
+    ("Quick Ratio", "quickRatioAnnual", format_ratio),
+)
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False, hash_funcs=PAYLOAD_HASH_FUNCS)
 def compute_ratios(finnhub_data):
     """
     Compute key financial ratios from Finnhub data.
@@ -66,70 +98,13 @@ def compute_ratios(finnhub_data):
     if not finnhub_data:
         return {}
     
-    ratios = {}
-    
     try:
-        metrics = finnhub_data.get("metric", {})
-        
-        # Core Valuation Ratios
-        pe_ratio = metrics.get("peNormalizedAnnual")
-        if pe_ratio and pe_ratio != 0:
-            ratios["P/E Ratio"] = format_ratio(pe_ratio)
-        else:
-            ratios["P/E Ratio"] = "N/A"
-        
-        price_sales = metrics.get("psAnnual")
-        if price_sales:
-            ratios["Price/Sales"] = format_ratio(price_sales)
-        else:
-            ratios["Price/Sales"] = "N/A"
-        
-        # Debt and Leverage Ratios
-        debt_equity = metrics.get("totalDebt/totalEquityAnnual")
-        if debt_equity:
-            ratios["Debt/Equity"] = format_ratio(debt_equity)
-        else:
-            ratios["Debt/Equity"] = "N/A"
-        
-        # Profitability Ratios  
-        roe = metrics.get("roeAnnual")
-        if roe and roe != 0:
-            ratios["ROE"] = format_percent(roe * 100)  # Convert decimal to percentage
-        else:
-            ratios["ROE"] = "N/A"
-
-        # ROA
-        roa = metrics.get("roaAnnual") 
-        if roa and roa != 0:
-            ratios["ROA"] = format_percent(roa * 100)  # Convert decimal to percentage
-        else:
-            ratios["ROA"] = "N/A"
-
-        # EBITDA Margin
-        ebitda_margin = metrics.get("ebitdaMarginAnnual")
-        if ebitda_margin and ebitda_margin != 0:
-            ratios["EBITDA Margin"] = format_percent(ebitda_margin)
-        else:
-            ratios["EBITDA Margin"] = "N/A"
-        
-        gross_margin = metrics.get("grossMarginAnnual")
-        if gross_margin:
-            ratios["Gross Margin"] = format_percent(gross_margin)
-        else:
-            ratios["Gross Margin"] = "N/A"
-        
-        # Liquidity Ratios
-        current_ratio = metrics.get("currentRatioAnnual")
-        if current_ratio:
-            ratios["Current Ratio"] = format_ratio(current_ratio)
-        else:
-            ratios["Current Ratio"] = "N/A"
-        
-        quick_ratio = metrics.get("quickRatioAnnual")
-        if quick_ratio:
-            ratios["Quick Ratio"] = format_ratio(quick_ratio)
-        else:
-            ratios["Quick Ratio"] = "N/A"
+        metrics = finnhub_data.get("metric") or {}
+        ratios = {}
+        for label, key, formatter in _RATIO_MAP:
+            value = metrics.get(key)
+            # Missing and zero values both display as N/A
+            ratios[label] = formatter(value) if value else "N/A"
         
     except Exception as e:
         # If there's any error in computation, return empty dict
@@ -138,46 +113,87 @@ def compute_ratios(finnhub_data):
     
     return ratios
 
+# (summary label, Finnhub metric key), in display order
+_TREND_MAP = (
+    ("Revenue Growth (YoY)", "revenueGrowthTTMYoy"),
+    ("Net Profit Margin", "netProfitMarginAnnual"),
+    ("EPS Growth (YoY)", "epsGrowthTTMYoy"),
+    ("Return on Assets", "roaAnnual"),
+)
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False, hash_funcs=PAYLOAD_HASH_FUNCS)
 def summarize_trends(finnhub_data):
     """Generate trend summary with corrected growth calculations"""
     if not finnhub_data:
         return "No trend data available."
     
     try:
-        metrics = finnhub_data.get("metric", {})
+        metrics = finnhub_data.get("metric") or {}
         summary_lines = []
-        
-        # Revenue Growth
-        revenue_growth = metrics.get("revenueGrowthTTMYoy")
-        if revenue_growth is not None:
-            summary_lines.append(f"Revenue Growth (YoY): {revenue_growth:.1f}%")
-        else:
-            summary_lines.append("Revenue Growth (YoY): N/A")
-        
-        # Other metrics
-        profit_margin = metrics.get("netProfitMarginAnnual")
-        if profit_margin is not None:
-            summary_lines.append(f"Net Profit Margin: {profit_margin:.1f}%")
-        else:
-            summary_lines.append("Net Profit Margin: N/A")
-        
-        eps_growth = metrics.get("epsGrowthTTMYoy")
-        if eps_growth is not None:
-            summary_lines.append(f"EPS Growth (YoY): {eps_growth:.1f}%")
-        else:
-            summary_lines.append("EPS Growth (YoY): N/A")
-        
-        roa = metrics.get("roaAnnual")
-        if roa is not None:
-            summary_lines.append(f"Return on Assets: {roa:.1f}%")
-        else:
-            summary_lines.append("Return on Assets: N/A")
+        for label, key in _TREND_MAP:
+            value = metrics.get(key)
+            # Finnhub already reports these as percentages
+            summary_lines.append(f"{label}: {value:.1f}%" if value is not None else f"{label}: N/A")
         
         return "\n".join(summary_lines)
         
     except Exception as e:
         return f"Error generating trend summary: {str(e)}"
     
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False, hash_funcs=PAYLOAD_HASH_FUNCS)
+def prepare_view_model(finnhub_data):
+    """
+    Pre-format everything the report cards display in a single pass.
+    Returns a flat dict of display-ready values shared by the ui display_* functions.
+    """
+    if not finnhub_data:
+        return {}
+    
+    metrics = finnhub_data.get("metric", {}) or {}
+    
+    # Company description, handle cases where it might be empty or "N/A"
+    description = finnhub_data.get("description", "")
+    if not description or description == "N/A" or description.strip() == "":
+        description = "No company description available from data sources."
+    
+    # Ratio cards (up to 8), pre-formatted for st.metric
+    ratios = compute_ratios(finnhub_data)
+    ratio_cards = []
+    for key, value in list(ratios.items())[:8]:
+        if value != "N/A" and isinstance(value, (int, float, str)):
+            try:
+                if isinstance(value, str) and '%' in value:
+                    display_value = value
+                else:
+                    display_value = f"{float(value):.2f}" if isinstance(value, (int, float)) else str(value)
+            except (ValueError, TypeError):
+                display_value = str(value)
+        else:
+            display_value = "N/A"
+        ratio_cards.append((key, display_value))
+    
+    market_cap = finnhub_data.get("marketCap", "N/A")
+    
+    return {
+        "name": finnhub_data.get("name", "N/A"),
+        "sector": finnhub_data.get("sector", "N/A"),
+        "industry": finnhub_data.get("industry", "N/A"),
+        "description": description,
+        "market_cap": format_currency(market_cap),
+        "market_cap_delta": "↗️" if market_cap != "N/A" else "",
+        "current_price": format_currency(finnhub_data.get("currentPrice", "N/A")),
+        "week_high": format_currency(finnhub_data.get("52WeekHigh", "N/A")),
+        "week_low": format_currency(finnhub_data.get("52WeekLow", "N/A")),
+        "ratios": ratios,
+        "ratio_cards": ratio_cards,
+        "trend_data": {
+            'Revenue Growth (YoY)': f"{(metrics.get('revenueGrowthTTMYoy') or 0) * 100:.1f}%",
+            'Profit Margin': f"{(metrics.get('netProfitMarginAnnual') or 0):.1f}%",
+            'ROE': f"{(metrics.get('roeAnnual') or 0) * 100:.1f}%",
+            'ROA': f"{(metrics.get('roaAnnual') or 0) * 100:.1f}%"
+        }
+    }
+
 def get_financial_health_score(finnhub_data):
     """
     Calculate a simple financial health score based on key metrics.
@@ -1,5 +1,4 @@
 import plotly.graph_objects as go
-import plotly.express as px
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import pandas as pd
@@ -503,8 +502,8 @@ def create_portfolio_summary(company_data):
                 ),
                 row=1, col=1
             )
-        except (ValueError, TypeError):
-            pass
+        except (ValueError, TypeError, ZeroDivisionError):
+            pass  # Non-numeric values or a flat 52-week range (high == low) - skip the gauge
     
     # Financial Health Scores
     metrics = company_data.get('metric', {})
@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 
 # API Keys from Streamlit secrets, safely on deployment
@@ -11,6 +12,12 @@ TEMPERATURE = 0.2
 # App Configuration
 APP_NAME = "Financial Dashboard"
 APP_VERSION = "1.0.0"
+# Show tracebacks in the UI (secrets DEBUG=true or env DASHBOARD_DEBUG=1)
+def _is_truthy(value):
+    """Parse a bool / "1" / "true" / "yes" flag; strings like "false" or "0" stay off"""
+    return str(value).strip().lower() in ("1", "true", "yes")
+
+DEBUG_MODE = _is_truthy(st.secrets.get("DEBUG", "")) or _is_truthy(os.environ.get("DASHBOARD_DEBUG", ""))
 
 # API Endpoints
 FINNHUB_BASE_URL = "https://finnhub.io/api/v1"
@@ -20,6 +27,15 @@ SEC_BASE_URL = "https://data.sec.gov"
 CACHE_TTL_SHORT = 300   # 5 minutes
 CACHE_TTL_LONG = 600    # 10 minutes
 
+# Disk Cache Settings (survive app restarts)
+CACHE_DIR = ".cache"
+FILE_CACHE_TTL_FINNHUB = 300    # 5 minutes - matches the st.cache_data TTL, payload has a live quote
+FILE_CACHE_TTL_SEC = 86400      # 24 hours - filings list changes at most daily
+
+# LLM Response Cache (identical ticker + query + data)
+ANALYSIS_CACHE_TTL = 86400      # 24 hours
+ANALYSIS_CACHE_MAX_ENTRIES = 128
+
 # UI Configuration
 DEFAULT_TICKERS = ["AAPL", "GOOGL", "MSFT", "TSLA", "AMZN", "NVDA", "META"]
 MAX_SEC_FILINGS = 5
\ No newline at end of file
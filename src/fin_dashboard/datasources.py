@@ -1,13 +1,30 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
-import yfinance as yf
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from .config import FINNHUB_API_KEY
+from .config import (
+    FINNHUB_API_KEY,
+    CACHE_DIR,
+    FILE_CACHE_TTL_FINNHUB,
+    FILE_CACHE_TTL_SEC
+)
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import logging
 import time  # For retries
+try:
+    import orjson
+except ImportError:
+    orjson = None # Optional faster JSON decoding, stdlib json otherwise
 
 # ------------------------------
 # Logging setup
@@ -25,6 +42,23 @@ def log_error(message):
     """Log error and display in Streamlit"""
     logging.error(message)
 
+# ------------------------------
+# Shared HTTP session (keep-alive across Finnhub/SEC sub-calls)
+# ------------------------------
+_SESSION = requests.Session()
+# Sized for the concurrent Finnhub fan-out + SEC calls running side by side
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
+def get_http_session():
+    """Shared pooled requests.Session - reuse it for any ad-hoc HTTP call in the app"""
+    return _SESSION
+
+def parse_json(response):
+    """Decode a JSON response body - orjson when installed (much faster on the ~1 MB SEC files)"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
 # ------------------------------
 # Sync fetch with retry (simplified)
 # ------------------------------
@@ -34,7 +68,7 @@ def fetch_with_retry(url, headers=None, params=None, retries=2, delay=1, timeout
     
     for attempt in range(1, retries + 1):
         try:
-            response = requests.get(
+            response = _SESSION.get(
                 url, 
                 headers=headers, 
                 params=params, 
@@ -42,7 +76,7 @@ def fetch_with_retry(url, headers=None, params=None, retries=2, delay=1, timeout
             )
             
             if response.status_code == 200:
-                return {"success": True, "data": response.json()}
+                return {"success": True, "data": parse_json(response)}
             elif response.status_code == 404:
                 return {"success": False, "code": 404, "message": "Not Found"}
             elif response.status_code == 429:
@@ -69,6 +103,105 @@ def fetch_with_retry(url, headers=None, params=None, retries=2, delay=1, timeout
     
     return {"success": False, **last_error}
 
+# ------------------------------
+# Concurrent fetch helper
+# ------------------------------
+def _with_script_ctx(ctx, call):
+    """Run call() on a worker thread attached to the given Streamlit script context"""
+    add_script_run_ctx(threading.current_thread(), ctx)
+    return call()
+
+def run_concurrently(*calls):
+    """
+    Run zero-argument callables in parallel threads, returning results in call order.
+    Worker threads inherit the Streamlit script context so cached/st.* calls still work.
+    """
+    run = partial(_with_script_ctx, get_script_run_ctx())
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        return list(executor.map(run, calls))
+
+def run_until_accepted(*calls, accept):
+    """
+    Race zero-argument callables in parallel threads and stop at the first result accept() approves.
+    Returns (index, result) pairs in completion order; laggards are cancelled or left to finish unwatched.
+    """
+    ctx = get_script_run_ctx()
+
+    executor = ThreadPoolExecutor(max_workers=len(calls))
+    futures = {executor.submit(_with_script_ctx, ctx, call): i for i, call in enumerate(calls)}
+    finished = []
+    try:
+        for future in as_completed(futures):
+            result = future.result()
+            finished.append((futures[future], result))
+            if accept(result):
+                break
+    finally:
+        # Don't block on a hung request once we have a winner
+        executor.shutdown(wait=False, cancel_futures=True)
+    return finished
+
+# ------------------------------
+# Disk cache for API responses
+# ------------------------------
+def make_cache_key(ticker, endpoint, count=None):
+    """Build a stable file-cache key for a ticker + endpoint pair"""
+    return hashlib.md5(f"{ticker}:{endpoint}:{count}".encode()).hexdigest()
+
+def cached_fetch(key, ttl, fn, *args, **kwargs):
+    """
+    Return fn(*args, **kwargs) from the on-disk cache while it is fresh.
+    On a miss the result is fetched and written back, unless it carries errors.
+    """
+    path = os.path.join(CACHE_DIR, f"{key}.json")
+
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        try:
+            entry = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        except ValueError:
+            # json.dump writes NaN/Infinity (Yahoo gaps), which orjson refuses to read
+            entry = json.loads(raw)
+        if time.time() - entry["ts"] < ttl:
+            return entry["data"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass  # Missing or corrupt entry - fall through to a fresh fetch
+
+    result = fn(*args, **kwargs)
+
+    # Never persist partial/failed responses
+    if isinstance(result, dict) and not result.get("errors"):
+        tmp_path = None
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # Unique temp file per writer - a prefetch and a click can write the same key at once
+            fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"ts": time.time(), "data": result}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            log_warning(f"File cache write failed for {key}: {e}")
+            if tmp_path:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    return result
+
+def clear_file_cache():
+    """Remove every cached API response from disk"""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".json"):
+            try:
+                os.remove(os.path.join(CACHE_DIR, name))
+            except OSError as e:
+                log_warning(f"File cache delete failed for {name}: {e}")
+
 # ------------------------------
 # Yahoo Finance Historical Data
 # ------------------------------
@@ -81,6 +214,8 @@ def get_yahoo_historical_data(symbol: str, period: str = "1mo"):
         period: Time period ("1mo", "3mo", "6mo", "1y", "2y", "5y")
     """
     try:
+        import yfinance as yf  # Deferred: only needed once a ticker is actually fetched
+        
         # Create yfinance ticker object
         ticker = yf.Ticker(symbol)
         
@@ -166,6 +301,7 @@ def get_multi_year_financial_data(symbol: str):
 
         # --- Fallback: yFinance with fixes if Finnhub incomplete ---
         if not financial_timeline:
+            import yfinance as yf  # Deferred: only needed when Finnhub data is incomplete
             headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
             ticker = yf.Ticker(symbol)
             
@@ -204,26 +340,23 @@ def get_multi_year_financial_data(symbol: str):
     }
 
 def calculate_historical_ratios(financial_data):
-    """Calculate historical financial ratios for trend analysis"""
+    """Calculate historical financial ratios for trend analysis (vectorized over years)"""
     ratios = {}
     
     try:
         # Revenue Growth Rate
         if 'revenue' in financial_data:
             revenue_data = financial_data['revenue']
-            if len(revenue_data['values']) > 1:
-                growth_rates = []
-                for i in range(1, len(revenue_data['values'])):
-                    prev = revenue_data['values'][i-1]
-                    curr = revenue_data['values'][i]
-                    if prev != 0:
-                        growth = ((curr - prev) / prev) * 100
-                        growth_rates.append(growth)
+            values = np.asarray(revenue_data['values'], dtype=float)
+            if len(values) > 1:
+                prev, curr = values[:-1], values[1:]
+                valid = prev != 0
+                growth_rates = (curr[valid] - prev[valid]) / prev[valid] * 100
                 
-                if growth_rates:
+                if growth_rates.size:
                     ratios['revenue_growth'] = {
-                        'dates': revenue_data['dates'][1:],
-                        'values': growth_rates
+                        'dates': np.asarray(revenue_data['dates'][1:])[valid].tolist(),
+                        'values': growth_rates.tolist()
                     }
         
         # Profit Margin Trend
@@ -232,26 +365,19 @@ def calculate_historical_ratios(financial_data):
             income_data = financial_data['net_income']
             
             # Match dates
-            common_dates = set(rev_data['dates']).intersection(set(income_data['dates']))
+            rev_by_date = dict(zip(rev_data['dates'], rev_data['values']))
+            income_by_date = dict(zip(income_data['dates'], income_data['values']))
+            common_dates = sorted(set(rev_by_date).intersection(income_by_date))
             if common_dates:
-                margins = []
-                dates = []
-                for date in sorted(common_dates):
-                    rev_idx = rev_data['dates'].index(date)
-                    inc_idx = income_data['dates'].index(date)
-                    
-                    revenue = rev_data['values'][rev_idx]
-                    income = income_data['values'][inc_idx]
-                    
-                    if revenue != 0:
-                        margin = (income / revenue) * 100
-                        margins.append(margin)
-                        dates.append(date)
+                revenues = np.array([rev_by_date[d] for d in common_dates], dtype=float)
+                incomes = np.array([income_by_date[d] for d in common_dates], dtype=float)
+                valid = revenues != 0
+                margins = incomes[valid] / revenues[valid] * 100
                 
-                if margins:
+                if margins.size:
                     ratios['profit_margin'] = {
-                        'dates': dates,
-                        'values': margins
+                        'dates': np.asarray(common_dates)[valid].tolist(),
+                        'values': margins.tolist()
                     }
         
         return ratios
@@ -262,7 +388,7 @@ def calculate_historical_ratios(financial_data):
 # ------------------------------
 # Enhanced Finnhub with Yahoo Integration
 # ------------------------------
-@st.cache_data(ttl=300)  # Cache for 5 minutes
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)  # Cache for 5 minutes
 def get_finnhub_company_data(symbol: str):
     """Fetch company data from Finnhub API with Yahoo Finance historical data"""
     
@@ -272,6 +398,8 @@ def get_finnhub_company_data(symbol: str):
     # Initialize results
     errors = []
     company_data = {
+        "symbol": symbol,
+        "as_of": datetime.now().isoformat(timespec="seconds"),  # Identifies this payload for cache keys
         "name": "N/A",
         "sector": "N/A", 
         "industry": "N/A",
@@ -282,12 +410,21 @@ def get_finnhub_company_data(symbol: str):
         "description": "N/A",
         "metric": {},
         "historical_prices": {},  # Yahoo Finance data
-        "multi_year_data": {}     # Multi-year financial data
+        "multi_year_data": {},    # Multi-year financial data
+        "has_multi_year": False   # Set once here so the UI never digs into multi_year_data
     }
     
     try:
+        # All sources are independent - fetch them concurrently
+        profile_result, quote_result, metrics_result, historical_data, multi_year_data = run_concurrently(
+            partial(fetch_with_retry, f"{base_url}/stock/profile2", params=params),
+            partial(fetch_with_retry, f"{base_url}/quote", params=params),
+            partial(fetch_with_retry, f"{base_url}/stock/metric", params={**params, "metric": "all"}),
+            partial(get_yahoo_historical_data, symbol, period="3mo"),
+            partial(get_multi_year_financial_data, symbol)
+        )
+
         # 1. Company Profile
-        profile_result = fetch_with_retry(f"{base_url}/stock/profile2", params=params)
         if profile_result["success"]:
             profile = profile_result["data"]
             company_data.update({
@@ -304,7 +441,6 @@ def get_finnhub_company_data(symbol: str):
             })
     
         # 2. Stock Quote
-        quote_result = fetch_with_retry(f"{base_url}/quote", params=params)
         if quote_result["success"]:
             quote = quote_result["data"]
             company_data.update({
@@ -318,8 +454,6 @@ def get_finnhub_company_data(symbol: str):
             })
     
         # 3. Basic Metrics
-        metrics_params = {**params, "metric": "all"}
-        metrics_result = fetch_with_retry(f"{base_url}/stock/metric", params=metrics_params)
         if metrics_result["success"]:
             metrics_data = metrics_result["data"]
             metrics = metrics_data.get("metric", {})
@@ -337,7 +471,6 @@ def get_finnhub_company_data(symbol: str):
             })
         
         # 4. Yahoo Finance Historical Prices (UPGRADED)
-        historical_data = get_yahoo_historical_data(symbol, period="3mo")
         company_data["historical_prices"] = historical_data
         
         if historical_data.get("error"):
@@ -348,8 +481,8 @@ def get_finnhub_company_data(symbol: str):
             })
         
         # 5. Multi-Year Financial Data (NEW FOR RAG)
-        multi_year_data = get_multi_year_financial_data(symbol)
         company_data["multi_year_data"] = multi_year_data
+        company_data["has_multi_year"] = bool(multi_year_data.get("financial_data"))
         
         if multi_year_data.get("error"):
             errors.append({
@@ -380,45 +513,60 @@ SEC_HEADERS = {
     "From": "student.research@university.edu"
 }
 
+def fetch_sec_company_tickers():
+    """Download SEC's ticker -> CIK table (~1 MB) in the {"data", "errors"} shape the disk cache expects"""
+    result = fetch_with_retry(
+        "https://www.sec.gov/files/company_tickers.json",
+        headers=SEC_HEADERS,
+        timeout=20,
+        retries=3
+    )
+    
+    if not result["success"]:
+        return {
+            "data": {},
+            "errors": [{"source": "SEC", "code": result.get("code"), "message": result.get("message", "Unknown error")}]
+        }
+    if not result["data"]:
+        return {
+            "data": {},
+            "errors": [{"source": "SEC", "code": "EMPTY_RESPONSE", "message": "SEC returned empty data"}]
+        }
+    return {"data": result["data"], "errors": []}
+
 @st.cache_data(ttl=600, show_spinner=False)
 def get_sec_cik_mapping():
-    """Get SEC CIK mapping data with better debugging"""
+    """
+    Get SEC CIK mapping data, kept on disk for a day so restarts skip the download.
+    Returns {"data", "errors"}; failures are reported by the caller, not rendered here,
+    since this also runs from the background prefetch thread.
+    """
     try:
-        result = fetch_with_retry(
-            "https://www.sec.gov/files/company_tickers.json",
-            headers=SEC_HEADERS,
-            timeout=20,
-            retries=3
+        return cached_fetch(
+            make_cache_key("SEC", "company_tickers"), FILE_CACHE_TTL_SEC,
+            fetch_sec_company_tickers
         )
-        
-        if result["success"]:
-            data = result["data"]
-            if data and len(data) > 0:
-                return data
-            else:
-                st.warning("⚠️ SEC returned empty data")
-                return {}
-        else:
-            error_msg = result.get("message", "Unknown error")
-            st.warning(f"⚠️ SEC CIK mapping failed: {error_msg}")
-            return {}
             
     except Exception as e:
-        st.error(f"❌ SEC CIK mapping exception: {str(e)}")
-        return {}
+        return {
+            "data": {},
+            "errors": [{"source": "SEC", "code": "EXCEPTION", "message": str(e)}]
+        }
 
-@st.cache_data(ttl=600, show_spinner=False)
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)  # Filings change daily at most
 def get_sec_filings(symbol: str, count: int = 5):
     """Fetch SEC filings with better error handling"""
     
     try:
         # Step 1: Get CIK mapping
-        cik_lookup = get_sec_cik_mapping()
+        mapping = get_sec_cik_mapping()
+        cik_lookup = mapping["data"]
         
         if not cik_lookup:
+            reason = mapping["errors"][0]["message"] if mapping["errors"] else "returned empty"
             return {
                 "data": [],
-                "errors": [{"source": "SEC", "code": "CIK_MAPPING_EMPTY", "message": "CIK mapping returned empty"}]
+                "errors": [{"source": "SEC", "code": "CIK_MAPPING_EMPTY", "message": f"SEC CIK mapping failed: {reason}"}]
             }
         
         # Step 2: Find CIK for symbol
@@ -494,4 +642,51 @@ def get_sec_filings(symbol: str, count: int = 5):
         return {
             "data": [],
             "errors": [{"source": "SEC", "code": "EXCEPTION", "message": error_msg}]
-        }
\ No newline at end of file
+        }
+
+# ------------------------------
+# Combined Fetch (Finnhub + SEC)
+# ------------------------------
+def fetch_company_bundle(symbol: str, count: int = 5, include_sec: bool = True):
+    """Fetch Finnhub and SEC data for a ticker in parallel, through the disk cache (SEC skipped if not included)"""
+    finnhub_call = partial(
+        cached_fetch, make_cache_key(symbol, "finnhub"), FILE_CACHE_TTL_FINNHUB,
+        get_finnhub_company_data, symbol
+    )
+    if not include_sec:
+        return finnhub_call(), {"data": [], "errors": []}
+    
+    return run_concurrently(
+        finnhub_call,
+        partial(
+            cached_fetch, make_cache_key(symbol, "sec", count), FILE_CACHE_TTL_SEC,
+            get_sec_filings, symbol, count=count
+        )
+    )
+
+# Tickers with a warm-up fetch in flight (avoids stacking duplicate prefetches)
+_PREFETCHING = set()
+_PREFETCH_LOCK = threading.Lock()
+
+def prefetch_company_bundle(symbol: str, count: int = 5, include_sec: bool = True):
+    """
+    Warm the Finnhub/SEC caches for a ticker in a background thread, so the next
+    View Reports / AI Analysis click is a cache hit instead of a cold fetch.
+    """
+    with _PREFETCH_LOCK:
+        if symbol in _PREFETCHING:
+            return
+        _PREFETCHING.add(symbol)
+
+    def _warm():
+        try:
+            fetch_company_bundle(symbol, count=count, include_sec=include_sec)
+        except Exception as e:
+            log_warning(f"Prefetch failed for {symbol}: {e}")
+        finally:
+            with _PREFETCH_LOCK:
+                _PREFETCHING.discard(symbol)
+
+    # No script context on purpose: the thread outlives this run, and the fetchers it calls render nothing
+    thread = threading.Thread(target=_warm, daemon=True)
+    thread.start()
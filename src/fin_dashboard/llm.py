@@ -1,8 +1,19 @@
 # LLM and AI, RAG BASED ANALYSIS
 import google.generativeai as genai
-from .config import GOOGLE_API_KEY, TEMPERATURE, GROQ_API_KEY
+from .config import (
+    GOOGLE_API_KEY,
+    TEMPERATURE,
+    GROQ_API_KEY,
+    ANALYSIS_CACHE_TTL,
+    ANALYSIS_CACHE_MAX_ENTRIES
+)
 import streamlit as st
 import numpy as np
+import hashlib
+import json
+import time
+import threading
+from collections import OrderedDict
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import pandas as pd
@@ -11,6 +22,10 @@ try:
     from groq import Groq
 except ImportError:
     Groq = None # Makes Groq optional if not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None # Optional faster cache-key serialization, stdlib json otherwise
 
 
 # Configure Gemini
@@ -26,23 +41,50 @@ def init_gemini_model():
     ]
     model = genai.GenerativeModel('models/gemini-2.0-flash', safety_settings=safety_settings)
     return model
-def generate_ai_content(prompt, model_type='gemini'):
+@st.cache_resource
+def init_groq_client():
+    """Initialize the Groq client once per process (keeps its HTTP connection pool warm)"""
+    return Groq(api_key=GROQ_API_KEY)
+def generate_ai_content(prompt, model_type='gemini', on_chunk=None):
     """
     Unified content generation with support for Gemini or Groq.
+    If on_chunk is given the response is streamed and on_chunk(text_so_far) is called per chunk.
     """
     if model_type == 'gemini':
         model = init_gemini_model()
+        generation_config = genai.types.GenerationConfig(
+            temperature=TEMPERATURE,
+            max_output_tokens=4000,
+        )
+        if on_chunk:
+            text = ""
+            for chunk in model.generate_content(prompt, generation_config=generation_config, stream=True):
+                if chunk.parts:
+                    text += chunk.text
+                    on_chunk(text)
+            return text or "Unable to generate analysis."
         response = model.generate_content(
             prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=TEMPERATURE,
-                max_output_tokens=4000,
-            )
+            generation_config=generation_config
         )
         return response.text if response and response.text else "Unable to generate analysis."
    
     elif model_type == 'groq' and Groq is not None and GROQ_API_KEY:
-        client = Groq(api_key=GROQ_API_KEY)
+        client = init_groq_client()
+        if on_chunk:
+            text = ""
+            for chunk in client.chat.completions.create(
+                model="llama-3.3-70b-versatile",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=TEMPERATURE,
+                max_tokens=4000,
+                stream=True,
+            ):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    text += delta
+                    on_chunk(text)
+            return text
         completion = client.chat.completions.create(
             model="llama-3.3-70b-versatile",
             messages=[{"role": "user", "content": prompt}],
@@ -52,7 +94,7 @@ def generate_ai_content(prompt, model_type='gemini'):
         return completion.choices[0].message.content
    
     raise ValueError("No valid LLM available.")
-def get_simple_ai_analysis(context_data, user_query):
+def get_simple_ai_analysis(context_data, user_query, on_chunk=None):
     """
     Simple AI analysis with uses direct Gemini API calls
     """
@@ -103,13 +145,13 @@ def get_simple_ai_analysis(context_data, user_query):
    
     # New: Use generate_ai_content with fallback
     try:
-        return generate_ai_content(full_prompt, model_type='gemini')
+        return generate_ai_content(full_prompt, model_type='gemini', on_chunk=on_chunk)
     except Exception as e:
         error_str = str(e).lower()
         if any(keyword in error_str for keyword in ["quota", "rate limit", "resource exhausted"]):
             if GROQ_API_KEY and Groq is not None:
                 try:
-                    return generate_ai_content(full_prompt, model_type='groq')
+                    return generate_ai_content(full_prompt, model_type='groq', on_chunk=on_chunk)
                 except Exception as groq_e:
                     st.error(f"Groq Fallback Error: {str(groq_e)}")
             st.warning("Gemini quota exceeded. Set up Groq API key for fallback.")
@@ -117,13 +159,13 @@ def get_simple_ai_analysis(context_data, user_query):
             st.error(f"AI Analysis Error: {str(e)}")
         return get_fallback_analysis(context_data, user_query) # Use existing basic fallback
    
-def get_enhanced_ai_analysis(context_data, user_query):
+def get_enhanced_ai_analysis(context_data, user_query, on_chunk=None, on_phase=None):
     # Check if user forced standard analysis
     force_standard = context_data.get("force_standard", False)
    
     if force_standard:
         # Skip RAG and go directly to standard analysis
-        standard_analysis = get_simple_ai_analysis(context_data, user_query)
+        standard_analysis = get_simple_ai_analysis(context_data, user_query, on_chunk=on_chunk)
         return {
             "analysis": standard_analysis,
             "method": "Standard AI",
@@ -132,7 +174,9 @@ def get_enhanced_ai_analysis(context_data, user_query):
     """
     Enhanced AI analysis that combines standard AI with RAG when available
     Uses RAG for historical context, falls back to standard AI if no multi-year data
+    on_phase(label) is called as each real RAG stage starts (for progress UIs)
     """
+    report_phase = on_phase or (lambda label: None)
     try:
         company_info = context_data.get("company_info", {})
        
@@ -145,11 +189,13 @@ def get_enhanced_ai_analysis(context_data, user_query):
             ticker = context_data.get("ticker", "UNKNOWN")
            
             # Create RAG store
-            vectorizer, documents, metadata, error = create_simple_rag_store(company_info, ticker)
+            report_phase("📊 Processing multi-year financial data...")
+            vectorizer, doc_vectors, documents, metadata, error = create_simple_rag_store(company_info, ticker)
            
             if not error and documents:
                 # Query RAG system for relevant context
-                rag_results = query_simple_rag(vectorizer, documents, metadata, user_query, top_k=3)
+                report_phase("🔍 Retrieving relevant historical context...")
+                rag_results = query_simple_rag(vectorizer, doc_vectors, documents, metadata, user_query, top_k=3)
                
                 if rag_results['documents']:
                     # Prepare RAG context
@@ -198,23 +244,24 @@ def get_enhanced_ai_analysis(context_data, user_query):
                     """
                    
                     # Generate enhanced response with fallback
+                    report_phase("🧠 Generating analysis with historical context...")
                     try:
-                        response_text = generate_ai_content(enhanced_prompt, model_type='gemini')
+                        response_text = generate_ai_content(enhanced_prompt, model_type='gemini', on_chunk=on_chunk)
                     except Exception as e:
                         error_str = str(e).lower()
                         if any(keyword in error_str for keyword in ["quota", "rate limit", "resource exhausted"]):
                             if GROQ_API_KEY and Groq is not None:
                                 try:
-                                    response_text = generate_ai_content(enhanced_prompt, model_type='groq')
+                                    response_text = generate_ai_content(enhanced_prompt, model_type='groq', on_chunk=on_chunk)
                                 except Exception as groq_e:
                                     st.error(f"Groq Fallback Error: {str(groq_e)}")
-                                    response_text = get_simple_ai_analysis(context_data, user_query)  # Chain to simple fallback
+                                    response_text = get_simple_ai_analysis(context_data, user_query, on_chunk=on_chunk)  # Chain to simple fallback
                             else:
                                 st.warning("Gemini quota exceeded. Set up Groq API key for fallback.")
-                                response_text = get_simple_ai_analysis(context_data, user_query)
+                                response_text = get_simple_ai_analysis(context_data, user_query, on_chunk=on_chunk)
                         else:
                             st.error(f"Enhanced AI Analysis Error: {str(e)}")
-                            response_text = get_simple_ai_analysis(context_data, user_query)
+                            response_text = get_simple_ai_analysis(context_data, user_query, on_chunk=on_chunk)
 
                     return {
                         "analysis": response_text,
@@ -223,7 +270,8 @@ def get_enhanced_ai_analysis(context_data, user_query):
                     }
        
         # Fallback to standard AI analysis
-        standard_analysis = get_simple_ai_analysis(context_data, user_query)
+        report_phase("🤖 No historical context matched - generating standard analysis...")
+        standard_analysis = get_simple_ai_analysis(context_data, user_query, on_chunk=on_chunk)
         return {
             "analysis": standard_analysis,
             "method": "Standard AI",
@@ -237,6 +285,22 @@ def get_enhanced_ai_analysis(context_data, user_query):
             "method": "Error",
             "context_sources": 0
         }
+# Fields the prompts and RAG documents actually read; everything else stays out of the context
+ANALYSIS_COMPANY_FIELDS = ("symbol", "name", "sector", "industry", "currentPrice", "marketCap",
+                           "52WeekHigh", "52WeekLow", "description", "multi_year_data")
+ANALYSIS_METRIC_FIELDS = ("netProfitMarginAnnual", "roeAnnual", "peNormalizedAnnual")
+ANALYSIS_FILING_FIELDS = ("form", "date")
+def extract_analysis_fields(company_info, sec_filings):
+    """Trim the Finnhub payload and SEC filings down to what the analysis uses (smaller prompt, cheaper cache key)"""
+    company_info = company_info or {}
+    slim_info = {key: company_info[key] for key in ANALYSIS_COMPANY_FIELDS if key in company_info}
+    metrics = company_info.get("metric") or {}
+    slim_info["metric"] = {key: metrics[key] for key in ANALYSIS_METRIC_FIELDS if key in metrics}
+    slim_filings = [
+        {key: filing.get(key) for key in ANALYSIS_FILING_FIELDS}
+        for filing in (sec_filings or [])
+    ]
+    return slim_info, slim_filings
 def format_ratios_for_prompt(ratios):
     """Format ratios dictionary for the prompt"""
     if not ratios:
@@ -261,6 +325,7 @@ def format_sec_filings_for_prompt(sec_filings):
    
     return "\n".join(formatted) if formatted else "No recent SEC filings available"
 # Backup simple analysis function for when API fails
+FALLBACK_NOTICE = "AI analysis is currently unavailable."
 def get_fallback_analysis(context_data, user_query):
     """Provide basic analysis when AI is unavailable"""
     company_info = context_data.get("company_info", {})
@@ -279,17 +344,58 @@ def get_fallback_analysis(context_data, user_query):
     - Debt/Equity: {ratios.get('Debt/Equity', 'N/A')}
     - ROE: {ratios.get('ROE', 'N/A')}
    
-    **Note:** This is a basic analysis. AI analysis is currently unavailable.
+    **Note:** This is a basic analysis. {FALLBACK_NOTICE}
     Please check your internet connection and API keys.
     """
    
     return analysis
 # ------------------------------
-# STREAMLIT-COMPATIBLE RAG SYSTEM
+# ANALYSIS RESPONSE CACHE
 # ------------------------------
 @st.cache_resource
+def _analysis_cache():
+    """Process-wide (lock, OrderedDict of {key: (timestamp, result)}) for finished analyses, oldest first"""
+    return threading.Lock(), OrderedDict()
+def analysis_cache_key(context_data, user_query):
+    """Stable key for (ticker, normalized query, context data)"""
+    query_hash = hashlib.sha1(user_query.strip().lower().encode()).hexdigest()
+    if orjson is not None:
+        payload = orjson.dumps(context_data, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(context_data, sort_keys=True, default=str).encode()
+    data_hash = hashlib.sha1(payload).hexdigest()
+    return f"{context_data.get('ticker', 'UNKNOWN')}:{query_hash}:{data_hash}"
+def get_cached_ai_analysis(context_data, user_query, on_chunk=None, on_phase=None):
+    """
+    get_enhanced_ai_analysis memoized on (ticker, query, data).
+    Errors and offline fallbacks are not cached so the next click retries the LLM.
+    on_chunk/on_phase report progress on a cache miss; hits return immediately.
+    """
+    lock, cache = _analysis_cache()
+    key = analysis_cache_key(context_data, user_query)
+   
+    # Shared by every session thread - all reads and writes go through the lock
+    with lock:
+        hit = cache.get(key)
+        if hit and time.time() - hit[0] < ANALYSIS_CACHE_TTL:
+            return hit[1]
+   
+    # LLM call runs outside the lock so other sessions are not blocked behind it
+    result = get_enhanced_ai_analysis(context_data, user_query, on_chunk=on_chunk, on_phase=on_phase)
+   
+    if result.get("method") != "Error" and FALLBACK_NOTICE not in str(result.get("analysis", "")):
+        with lock:
+            cache.pop(key, None)  # Re-insert at the end so insertion order stays oldest-first
+            while len(cache) >= ANALYSIS_CACHE_MAX_ENTRIES:
+                cache.popitem(last=False)  # Evict oldest
+            cache[key] = (time.time(), result)
+   
+    return result
+# ------------------------------
+# STREAMLIT-COMPATIBLE RAG SYSTEM
+# ------------------------------
 def init_simple_rag_system():
-    """Initialize lightweight RAG system for Streamlit"""
+    """Initialize lightweight RAG system for Streamlit (fresh per store, fitting mutates it)"""
     # Use TF-IDF instead of sentence transformers (lighter)
     vectorizer = TfidfVectorizer(
         max_features=1000,
@@ -490,40 +596,41 @@ def prepare_financial_documents(company_data, ticker):
         metadata.append({'type': 'stability', 'metric': 'revenue', 'ticker': ticker})
    
     return documents, metadata
-@st.cache_data(ttl=3600, show_spinner=False)
+@st.cache_resource(ttl=3600, show_spinner=False)
+def build_rag_index(doc_hash, _documents):
+    """Fit the TF-IDF index once per unique document set (keyed by content hash)"""
+    vectorizer = init_simple_rag_system()
+    doc_vectors = vectorizer.fit_transform(_documents)
+    return vectorizer, doc_vectors
 def create_simple_rag_store(company_data, ticker):
     """Create lightweight in-memory RAG store for Streamlit"""
     try:
-        vectorizer = init_simple_rag_system()
-       
         # Prepare documents
         documents, metadata = prepare_financial_documents(company_data, ticker)
        
         if not documents:
-            return None, [], [], "No financial data available"
+            return None, None, [], [], "No financial data available"
        
-        # Create TF-IDF vectors (much lighter than embeddings)
+        # Create TF-IDF vectors (much lighter than embeddings), reused across reruns
+        doc_hash = hashlib.sha1("\n".join(documents).encode()).hexdigest()
         try:
-            tfidf_matrix = vectorizer.fit_transform(documents)
+            vectorizer, doc_vectors = build_rag_index(doc_hash, documents)
         except Exception as e:
-            return None, [], [], f"Vectorization failed: {str(e)}"
+            return None, None, [], [], f"Vectorization failed: {str(e)}"
        
-        return vectorizer, documents, metadata, None
+        return vectorizer, doc_vectors, documents, metadata, None
        
     except Exception as e:
-        return None, [], [], str(e)
-def query_simple_rag(vectorizer, documents, metadata, query, top_k=3):
+        return None, None, [], [], str(e)
+def query_simple_rag(vectorizer, doc_vectors, documents, metadata, query, top_k=3):
     """Query the lightweight RAG system"""
     try:
         if not documents:
             return {'documents': [], 'metadatas': [], 'scores': []}
        
-        # Transform query
+        # Transform query (document vectors are precomputed in the index)
         query_vector = vectorizer.transform([query])
        
-        # Transform documents
-        doc_vectors = vectorizer.transform(documents)
-       
         # Calculate similarities
         similarities = cosine_similarity(query_vector, doc_vectors).flatten()
        
@@ -548,7 +655,7 @@ def generate_rag_enhanced_analysis(company_data, ticker, user_query):
     """Generate RAG-enhanced analysis using lightweight system"""
     try:
         # Create simple RAG store
-        vectorizer, documents, metadata, error = create_simple_rag_store(company_data, ticker)
+        vectorizer, doc_vectors, documents, metadata, error = create_simple_rag_store(company_data, ticker)
         if error:
             return f"RAG system unavailable: {error}. Using standard analysis."
        
@@ -556,7 +663,7 @@ def generate_rag_enhanced_analysis(company_data, ticker, user_query):
             return "No historical financial data available for enhanced analysis."
        
         # Query RAG system
-        rag_results = query_simple_rag(vectorizer, documents, metadata, user_query, top_k=3)
+        rag_results = query_simple_rag(vectorizer, doc_vectors, documents, metadata, user_query, top_k=3)
        
         if not rag_results['documents']:
             return "No relevant historical context found. Using current data analysis."
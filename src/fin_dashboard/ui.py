@@ -1,5 +1,8 @@
+import importlib
+import re
+import threading
 import streamlit as st
-from .analytics import compute_ratios, summarize_trends, format_currency
+from .analytics import summarize_trends, prepare_view_model
 from .charts import (
     create_price_chart, 
     create_ratios_chart, 
@@ -10,6 +13,27 @@ from .charts import (
     create_portfolio_summary
 )
 
+# AI insight formatting patterns, compiled once at import
+BOLD_RE = re.compile(r'\*\*(.*?)\*\*')
+BULLET_RE = re.compile(r'^[\s]*[-•*]\s*', re.MULTILINE)
+NUMBERED_RE = re.compile(r'^[\s]*(\d+)\.[\s]*', re.MULTILINE)
+
+# Heavy modules (Gemini SDK, scikit-learn) only needed once the user clicks, relative to this package
+_PREWARM_MODULES = (".llm",)
+
+@st.cache_resource
+def prewarm_imports():
+    """Import heavy modules in a background thread once per process"""
+    def _load():
+        for module in _PREWARM_MODULES:
+            try:
+                importlib.import_module(module, __package__)
+            except Exception:
+                pass  # The real import at call time will surface the error
+    thread = threading.Thread(target=_load, daemon=True)
+    thread.start()
+    return thread
+
 def init_streamlit():
     """Initialize Streamlit configuration and custom styling"""
     st.set_page_config(
@@ -155,22 +179,22 @@ def init_streamlit():
     st.markdown('<h1 class="main-title">📊 Financial + SEC Dashboard</h1>', unsafe_allow_html=True)
     st.markdown('<p class="sub-title">Advanced financial analysis with historical data, RAG-powered insights, and predictive analytics</p>', unsafe_allow_html=True)
 
+    # Warm heavy imports while the user reads the page
+    prewarm_imports()
+
 def display_company_info(finnhub_data):
     """Display company information in a professional card"""
     if not finnhub_data:
         st.warning("⚠️ No company information available")
         return
     
-    # Get description, handle cases where it might be empty or "N/A"
-    description = finnhub_data.get('description', '')
-    if not description or description == "N/A" or description.strip() == "":
-        description = "No company description available from data sources."
+    vm = prepare_view_model(finnhub_data)
     
     st.markdown(f"""
     <div class="report-card">
         <div class="card-title">🏢 Company Overview</div>
-        <div class="card-subtitle">{finnhub_data.get('name', 'N/A')} • {finnhub_data.get('sector', 'N/A')} • {finnhub_data.get('industry', 'N/A')}</div>
-        <p style="color: #4a5568; line-height: 1.8; margin: 0; font-size: 16px;">{description}</p>
+        <div class="card-subtitle">{vm['name']} • {vm['sector']} • {vm['industry']}</div>
+        <p style="color: #4a5568; line-height: 1.8; margin: 0; font-size: 16px;">{vm['description']}</p>
     </div>
     """, unsafe_allow_html=True)
 
@@ -185,42 +209,14 @@ def display_financial_metrics(finnhub_data):
         <div class="card-title">💹 Financial Metrics Dashboard</div>
     """, unsafe_allow_html=True)
 
+    vm = prepare_view_model(finnhub_data)
+
     # Key Metrics Grid
     col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        market_cap = finnhub_data.get('marketCap', 'N/A')
-        if market_cap != 'N/A':
-            market_cap_formatted = format_currency(market_cap)
-            market_cap_change = "↗️" if market_cap != 'N/A' else ""
-        else:
-            market_cap_formatted = "N/A"
-            market_cap_change = ""
-        st.metric("Market Cap", market_cap_formatted, delta=market_cap_change)
-    
-    with col2:
-        current_price = finnhub_data.get('currentPrice', 'N/A')
-        if current_price != 'N/A':
-            price_formatted = format_currency(current_price)
-        else:
-            price_formatted = "N/A"
-        st.metric("Current Price", price_formatted)
-    
-    with col3:
-        week_high = finnhub_data.get('52WeekHigh', 'N/A')
-        if week_high != 'N/A':
-            high_formatted = format_currency(week_high)
-        else:
-            high_formatted = "N/A"
-        st.metric("52W High", high_formatted)
-    
-    with col4:
-        week_low = finnhub_data.get('52WeekLow', 'N/A')
-        if week_low != 'N/A':
-            low_formatted = format_currency(week_low)
-        else:
-            low_formatted = "N/A"
-        st.metric("52W Low", low_formatted)
+    col1.metric("Market Cap", vm['market_cap'], delta=vm['market_cap_delta'])
+    col2.metric("Current Price", vm['current_price'])
+    col3.metric("52W High", vm['week_high'])
+    col4.metric("52W Low", vm['week_low'])
     
     st.markdown("</div>", unsafe_allow_html=True)
     
@@ -283,7 +279,8 @@ def display_ratios(finnhub_data):
         st.warning("⚠️ No ratio data available")
         return
         
-    ratios = compute_ratios(finnhub_data)
+    vm = prepare_view_model(finnhub_data)
+    ratios = vm['ratios']
     if not ratios:
         st.info("ℹ️ Ratio calculations not available for this company")
         return
@@ -295,31 +292,9 @@ def display_ratios(finnhub_data):
     """, unsafe_allow_html=True)
 
     # Ratios metrics grid
-    col1, col2, col3, col4 = st.columns(4)
-    ratio_keys = list(ratios.keys())
-    
-    for i, key in enumerate(ratio_keys[:8]):  # Show up to 8 ratios
-        col = [col1, col2, col3, col4][i % 4]
-        value = ratios[key]
-        
-        if value != "N/A" and isinstance(value, (int, float, str)):
-            try:
-                if isinstance(value, str) and '%' in value:
-                    display_value = value
-                else:
-                    display_value = f"{float(value):.2f}" if isinstance(value, (int, float)) else str(value)
-            except:
-                display_value = str(value)
-        else:
-            display_value = "N/A"
-        
-        # Add color coding based on ratio health
-        if "Margin" in key or "ROE" in key:
-            delta_color = "normal" if display_value != "N/A" and float(display_value.replace('%', '')) > 15 else "inverse"
-        else:
-            delta_color = "normal"
-            
-        col.metric(key, display_value)
+    cols = st.columns(4)
+    for i, (key, display_value) in enumerate(vm['ratio_cards']):
+        cols[i % 4].metric(key, display_value)
 
     # Enhanced Ratios Chart
     ratios_chart = create_ratios_chart(ratios)
@@ -343,20 +318,13 @@ def display_trend_summary(finnhub_data):
     """, unsafe_allow_html=True)
     
     # Current period trends chart
-    trend_data = {
-        'Revenue Growth (YoY)': f"{finnhub_data.get('metric', {}).get('revenueGrowthTTMYoy', 0) * 100:.1f}%",
-        'Profit Margin': f"{finnhub_data.get('metric', {}).get('netProfitMarginAnnual', 0):.1f}%",
-        'ROE': f"{finnhub_data.get('metric', {}).get('roeAnnual', 0) * 100:.1f}%",
-        'ROA': f"{finnhub_data.get('metric', {}).get('roaAnnual', 0) * 100:.1f}%"
-    }
-    
-    trend_chart = create_trend_chart(trend_data)
+    trend_chart = create_trend_chart(prepare_view_model(finnhub_data)['trend_data'])
     if trend_chart:
         st.plotly_chart(trend_chart, use_container_width=True)
     
-    # Multi-year trends (if available)
-    multi_year_data = finnhub_data.get('multi_year_data', {})
-    if multi_year_data and multi_year_data.get('financial_data'):
+    # Multi-year trends (if available) - same flag the AI panel checks
+    if finnhub_data.get('has_multi_year'):
+        multi_year_data = finnhub_data['multi_year_data']
         st.markdown("### 📊 Multi-Year Financial Trends")
         
         financial_trends_chart = create_financial_trends_chart(multi_year_data)
@@ -379,11 +347,10 @@ def display_sec_filings(sec_data):
         st.info("ℹ️ No SEC filings data available")
         return "No SEC filings available"
     
-    sec_summary = ""
-    for filing in sec_data[:1]:
-        form = filing.get('form', 'N/A')
-        date = filing.get('date', 'N/A')
-        sec_summary += f"• Form {form} filed on {date}<br>"
+    sec_summary = "".join(
+        f"• Form {filing.get('form', 'N/A')} filed on {filing.get('date', 'N/A')}<br>"
+        for filing in sec_data[:1]
+    )
     
     st.markdown(f"""
     <div class="report-card">
@@ -409,33 +376,36 @@ def display_sec_filings(sec_data):
     
     return sec_summary
 
-def display_ai_insights(answer):
-    """Enhanced AI insights display with proper formatting"""
-    if not answer:
-        st.warning("⚠️ No AI insights available")
-        return
-    
-    # Clean and format the text
-    import re
-    formatted_answer = str(answer)
-    
+@st.cache_data(max_entries=16, show_spinner=False)
+def format_ai_insights(text):
+    """AI answer text -> HTML for the insights card; cached so reruns skip the regex pipeline"""
     # Fix markdown bold formatting
-    formatted_answer = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', formatted_answer)
+    formatted_answer = BOLD_RE.sub(r'<strong>\1</strong>', text)
     
     # Fix line breaks and paragraphs
     formatted_answer = formatted_answer.replace('\n\n', '</p><p>')
     formatted_answer = formatted_answer.replace('\n', '<br>')
     
     # Fix bullet points
-    formatted_answer = re.sub(r'^[\s]*[-•*]\s*', '• ', formatted_answer, flags=re.MULTILINE)
+    formatted_answer = BULLET_RE.sub('• ', formatted_answer)
     
     # Fix numbered lists
-    formatted_answer = re.sub(r'^[\s]*(\d+)\.[\s]*', r'\1. ', formatted_answer, flags=re.MULTILINE)
+    formatted_answer = NUMBERED_RE.sub(r'\1. ', formatted_answer)
     
     # Wrap in paragraphs if not already
     if not formatted_answer.startswith('<p>'):
         formatted_answer = f'<p>{formatted_answer}</p>'
     
+    return formatted_answer
+
+def display_ai_insights(answer):
+    """Enhanced AI insights display with proper formatting"""
+    if not answer:
+        st.warning("⚠️ No AI insights available")
+        return
+    
+    formatted_answer = format_ai_insights(str(answer))
+    
     st.markdown(f"""
     <div class="report-card">
         <div class="card-title">🤖 AI Financial Analysis</div>
@@ -471,4 +441,176 @@ def display_portfolio_summary(finnhub_data):
     if portfolio_chart:
         st.plotly_chart(portfolio_chart, use_container_width=True)
     
-    st.markdown("</div>", unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown("</div>", unsafe_allow_html=True)
+
+# ------------------------------
+# Welcome Screen feature cards (static, built once at import)
+# ------------------------------
+WELCOME_REPORTS_CARD = """
+        <div style="text-align: center; padding: 24px; background: linear-gradient(135deg, #e6f3ff 0%, #f0f8ff 100%); border-radius: 15px; border: 2px solid rgba(66, 153, 225, 0.2); margin-bottom: 20px;">
+            <h3 style="color: #2b6cb0; margin-bottom: 12px;">📊 View Reports</h3>
+            <p style="color: #4a5568; font-size: 14px; line-height: 1.6; margin: 0;">
+                • Interactive price & volume charts<br>
+                • Multi-year financial trends<br>
+                • Professional ratio analysis<br>
+                • Predictive insights
+            </p>
+        </div>
+        """
+
+WELCOME_AI_CARD = """
+        <div style="text-align: center; padding: 24px; background: linear-gradient(135deg, #f0fff4 0%, #f7fafc 100%); border-radius: 15px; border: 2px solid rgba(56, 161, 105, 0.2); margin-bottom: 20px;">
+            <h3 style="color: #38a169; margin-bottom: 12px;">🧠 Enhanced AI Analysis</h3>
+            <p style="color: #4a5568; font-size: 14px; line-height: 1.6; margin: 0;">
+                • Gemini-powered insights<br>
+                • RAG-enhanced Historical data integration<br>
+                • Custom query responses<br>
+                • Predictive recommendations
+            </p>
+        </div>
+        """
+
+# ------------------------------
+# AI Analysis Report (templates hoisted out of the render path)
+# ------------------------------
+RAG_REPORT_HEADER = """
+                    <div style="
+                        background: linear-gradient(135deg, #1a365d 0%, #2d3748 100%);
+                        color: white;
+                        padding: 30px;
+                        border-radius: 15px 15px 0 0;
+                        margin: 20px 0 0 0;
+                    ">
+                        <div style="font-size: 28px; font-weight: 800; margin-bottom: 8px;">
+                            📊 FINANCIAL INTELLIGENCE REPORT
+                        </div>
+                        <div style="font-size: 16px; opacity: 0.9; font-weight: 500;">
+                            Enhanced Analysis • {context_sources} Multi-Year Data Points • RAG-Powered Insights
+                        </div>
+                    </div>
+                    """
+
+RAG_REPORT_BODY = """<div style="
+                        background: linear-gradient(135deg, #f7fafc 0%, #edf2f7 100%);
+                        border-left: 6px solid #38b2ac;
+                        padding: 0;
+                        margin: 0 0 20px 0;
+                        box-shadow: 0 10px 30px rgba(0,0,0,0.1);
+                        color: #2d3748;
+                    ">
+                        <div style="
+                            background: rgba(56, 178, 172, 0.1);
+                            padding: 20px 30px;
+                            border-bottom: 2px solid rgba(56, 178, 172, 0.2);
+                        ">
+                            <div style="font-size: 20px; font-weight: 700; color: #2d3748; margin-bottom: 5px;">
+                                📈 EXECUTIVE ANALYSIS
+                            </div>
+                            <div style="font-size: 14px; color: #4a5568; font-weight: 500;">
+                                Historical Context Integration & Predictive Modeling
+                            </div>
+                        </div>
+                            {formatted_text}
+                        </div>
+                    </div>"""
+
+RAG_REPORT_FOOTER = """
+                    <div style="
+                        background: linear-gradient(135deg, #38b2ac 0%, #319795 100%);
+                        color: white;
+                        padding: 25px 30px;
+                        border-radius: 0 0 15px 15px;
+                        margin: 0;
+                    ">
+                        <div style="font-size: 16px; font-weight: 600; margin-bottom: 8px;">
+                            🔬 METHODOLOGY & DATA SOURCES
+                        </div>
+                        <div style="font-size: 14px; opacity: 0.95; line-height: 1.6;">
+                            Advanced RAG system analyzed {context_sources} historical data points spanning multiple fiscal years. 
+                            Real-time market data integrated with historical patterns using AI-powered retrieval and synthesis.
+                        </div>
+                    </div>
+                    """
+
+STANDARD_REPORT_HEADER = """
+                    <div style="
+                        background: linear-gradient(135deg, #553c9a 0%, #667eea 100%);
+                        color: white;
+                        padding: 30px;
+                        border-radius: 15px 15px 0 0;
+                        margin: 20px 0 0 0;
+                    ">
+                        <div style="font-size: 28px; font-weight: 800; margin-bottom: 8px;">
+                            🤖 AI FINANCIAL REPORT
+                        </div>
+                        <div style="font-size: 16px; opacity: 0.9; font-weight: 500;">
+                            Professional Analysis • Current Market Data • AI-Generated Insights
+                        </div>
+                    </div>
+                    """
+
+STANDARD_REPORT_BODY = """<div style="
+                        background: linear-gradient(135deg, #f7fafc 0%, #edf2f7 100%);
+                        border-left: 6px solid #667eea;
+                        padding: 0;
+                        margin: 0 0 20px 0;
+                        box-shadow: 0 10px 30px rgba(0,0,0,0.1);
+                        color: #2d3748;
+                    ">
+                        <div style="
+                            background: rgba(102, 126, 234, 0.1);
+                            padding: 20px 30px;
+                            border-bottom: 2px solid rgba(102, 126, 234, 0.2);
+                        ">
+                            <div style="font-size: 20px; font-weight: 700; color: #2d3748; margin-bottom: 5px;">
+                                📋 FINANCIAL ASSESSMENT
+                            </div>
+                            <div style="font-size: 14px; color: #4a5568; font-weight: 500;">
+                                Current Market Analysis & Performance Evaluation
+                            </div>
+                        </div>
+                            {formatted_text}
+                        </div>
+                    </div>"""
+
+STANDARD_REPORT_FOOTER = """
+                    <div style="
+                        background: linear-gradient(135deg, #667eea 0%, #553c9a 100%);
+                        color: white;
+                        padding: 25px 30px;
+                        border-radius: 0 0 15px 15px;
+                        margin: 0;
+                    ">
+                        <div style="font-size: 16px; font-weight: 600; margin-bottom: 8px;">
+                            📊 ANALYSIS SCOPE
+                        </div>
+                        <div style="font-size: 14px; opacity: 0.95; line-height: 1.6;">
+                            Analysis based on current financial metrics and real-time market data. 
+                            For enhanced historical context and predictive modeling, multi-year data is required.
+                        </div>
+                    </div>
+                    """
+
+def render_report_frame(method_used, context_sources):
+    """Header + footer HTML for an analysis report"""
+    if method_used == "RAG-Enhanced":
+        return (
+            RAG_REPORT_HEADER.format(context_sources=context_sources),
+            RAG_REPORT_FOOTER.format(context_sources=context_sources)
+        )
+    return STANDARD_REPORT_HEADER, STANDARD_REPORT_FOOTER
+
+def display_analysis_report(method_used, context_sources, formatted_text):
+    """Professional financial report card for a cleaned AI analysis text"""
+    header_html, footer_html = render_report_frame(method_used, context_sources)
+    
+    if method_used == "RAG-Enhanced":
+        st.success(f"✅ Enhanced Analysis Complete • {context_sources} Historical Data Points")
+        body_template = RAG_REPORT_BODY
+    else:
+        st.success("✅ AI Financial Analysis Complete")
+        body_template = STANDARD_REPORT_BODY
+    
+    st.markdown(header_html, unsafe_allow_html=True)
+    st.markdown(body_template.format(formatted_text=formatted_text), unsafe_allow_html=True)
+    st.markdown(footer_html, unsafe_allow_html=True)